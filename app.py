@@ -3,8 +3,9 @@ import sqlite3
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import os
+import time
 
 # Page configuration
 st.set_page_config(
@@ -15,11 +16,33 @@ st.set_page_config(
 
 # Database setup
 from database import init_database, get_db_connection
-from models import Project, Issue
+from models import Project, ProjectPhase, Issue, ChangeLog, Purger
+from sla import SLATracker, SLA_TARGETS_HOURS
+from timeline import build_timeline_figure, DETAIL_PHASE_LIMIT
+from charts import build_analytics_figures, figure_payload_size
+from maintenance import MaintenanceScheduler
 
 # Initialize database
 init_database()
 
+@st.cache_resource
+def start_purger():
+    """Start a single background purger per server process"""
+    purger = Purger()
+    purger.start()
+    return purger
+
+start_purger()
+
+@st.cache_resource
+def start_maintenance():
+    """Start a single background maintenance scheduler per server process"""
+    scheduler = MaintenanceScheduler()
+    scheduler.start()
+    return scheduler
+
+start_maintenance()
+
 def main():
     st.title("📊 Client Implementation Tracker")
     
@@ -27,8 +50,14 @@ def main():
     st.sidebar.title("Navigation")
     page = st.sidebar.selectbox(
         "Choose a page",
-        ["Dashboard", "Projects", "Issues", "Analytics"]
+        ["Dashboard", "Projects", "Issues", "Timeline", "Analytics"]
     )
+    auto_refresh = st.sidebar.checkbox("Auto-refresh on changes", value=False, key="auto_refresh")
+    if auto_refresh:
+        refresh_interval = st.sidebar.slider("Check every (seconds)", 2, 60, 5)
+    
+    # Version the page is rendered from, so changes made while rendering are not missed
+    data_version = ChangeLog().get_latest_version()
     
     if page == "Dashboard":
         show_dashboard()
@@ -36,22 +65,65 @@ def main():
         show_projects()
     elif page == "Issues":
         show_issues()
+    elif page == "Timeline":
+        show_timeline()
     elif page == "Analytics":
         show_analytics()
+    
+    if auto_refresh:
+        wait_for_changes(data_version, refresh_interval)
+
+# How often wait_for_changes gives Streamlit a chance to handle widget interactions
+INTERACTION_CHECK_SECONDS = 0.25
+
+def wait_for_changes(data_version, interval):
+    """Poll the change log and rerun only once something has changed
+    
+    Nothing is sent to the browser while waiting. Reading st.session_state is a
+    yield point for Streamlit, so a widget interaction interrupts the wait within
+    INTERACTION_CHECK_SECONDS instead of after a full polling interval.
+    """
+    change_log = ChangeLog()
+    next_poll = time.monotonic() + interval
+    while st.session_state.auto_refresh:
+        time.sleep(INTERACTION_CHECK_SECONDS)
+        if time.monotonic() < next_poll:
+            continue
+        if change_log.get_latest_version() != data_version:
+            st.rerun()
+        next_poll = time.monotonic() + interval
+
+def load_projects_overview():
+    """Load the project overview, refetching only projects changed since the last load"""
+    change_log = ChangeLog()
+    project = Project()
+    overview = st.session_state.get('projects_overview')
+    loaded_version = st.session_state.get('projects_overview_version', 0)
+    latest_version = change_log.get_latest_version()
+    
+    if overview is None:
+        overview = {row['id']: row for row in project.get_overview()}
+    elif latest_version != loaded_version:
+        changed_ids = change_log.get_changed_projects(loaded_version)
+        if changed_ids is None:
+            overview = {row['id']: row for row in project.get_overview()}
+        else:
+            refreshed = {row['id']: row for row in project.get_overview(changed_ids)}
+            for project_id in changed_ids:
+                if project_id in refreshed:
+                    overview[project_id] = refreshed[project_id]
+                else:
+                    overview.pop(project_id, None)
+    
+    st.session_state.projects_overview = overview
+    st.session_state.projects_overview_version = latest_version
+    return pd.DataFrame([overview[project_id] for project_id in sorted(overview)])
 
 def show_dashboard():
     st.header("Project Dashboard")
     
     # Get all projects
-    conn = get_db_connection()
-    projects_df = pd.read_sql_query("""
-        SELECT p.*, 
-               AVG(pp.completion_percentage) as overall_progress
-        FROM projects p
-        LEFT JOIN project_phases pp ON p.id = pp.project_id
-        GROUP BY p.id
-    """, conn)
-    conn.close()
+    projects_df = load_projects_overview()
     
     if projects_df.empty:
         st.info("No projects found. Add some projects in the Projects section!")
@@ -75,6 +147,8 @@ def show_dashboard():
         avg_progress = projects_df['overall_progress'].mean() if not projects_df.empty else 0
         st.metric("Average Progress", f"{avg_progress:.1f}%")
     
+    show_sla_status()
+    
     # Project progress overview
     st.subheader("Project Progress Overview")
     
@@ -86,6 +160,33 @@ def show_dashboard():
             st.write(f"Start Date: {project['start_date']}")
             st.write(f"Current Phase: {project['current_phase']}")
 
+def show_sla_status():
+    st.subheader("SLA Status")
+    
+    # Counters are maintained incrementally, so this only touches issues that
+    # crossed a threshold since the last visit
+    sla_tracker = SLATracker()
+    sla_tracker.advance()
+    summary = sla_tracker.get_summary()
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Open Issues", summary['open_count'])
+    with col2:
+        st.metric("At Risk", summary['at_risk_count'])
+    with col3:
+        st.metric("SLA Breached", summary['breached_count'])
+    
+    st.caption("Targets: " + ", ".join(f"{priority} {hours}h" for priority, hours in SLA_TARGETS_HOURS.items()))
+    
+    worst_projects = sla_tracker.get_project_counters()
+    if worst_projects:
+        st.dataframe(
+            pd.DataFrame(worst_projects)[['client_name', 'project_name', 'open_count', 'at_risk_count', 'breached_count']],
+            hide_index=True,
+            use_container_width=True
+        )
+
 def show_projects():
     st.header("Project Management")
     
@@ -98,15 +199,7 @@ def show_projects():
         manage_project()
 
 def display_projects():
-    conn = get_db_connection()
-    projects_df = pd.read_sql_query("""
-        SELECT p.*, 
-               AVG(pp.completion_percentage) as overall_progress
-        FROM projects p
-        LEFT JOIN project_phases pp ON p.id = pp.project_id
-        GROUP BY p.id
-    """, conn)
-    conn.close()
+    projects_df = load_projects_overview()
     
     if projects_df.empty:
         st.info("No projects found.")
@@ -224,19 +317,54 @@ def show_issues():
         add_issue()
 
 def display_issues():
-    conn = get_db_connection()
-    issues_df = pd.read_sql_query("""
-        SELECT i.*, p.client_name, p.project_name
-        FROM issues i
-        JOIN projects p ON i.project_id = p.id
-        ORDER BY i.created_date DESC
-    """, conn)
-    conn.close()
+    projects = Project().get_all()
+    project_labels = {project['id']: f"{project['client_name']} - {project['project_name']}" for project in projects}
+    
+    with st.expander("Filters", expanded=True):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            statuses = st.multiselect("Status", ["Open", "In Progress", "Resolved"])
+            priorities = st.multiselect("Priority", ["Critical", "High", "Medium", "Low"])
+        with col2:
+            client_names = st.multiselect("Client", sorted({project['client_name'] for project in projects}))
+            project_ids = st.multiselect("Project", list(project_labels), format_func=project_labels.get)
+        with col3:
+            created_range = st.date_input("Created between", value=())
+            min_age_days = st.number_input("Older than (days)", min_value=0, value=0)
+        col4, col5 = st.columns(2)
+        with col4:
+            sort_by = st.selectbox(
+                "Sort by",
+                ["newest", "priority", "oldest"],
+                format_func={"priority": "Priority", "newest": "Newest first", "oldest": "Oldest first"}.get
+            )
+        with col5:
+            limit = st.number_input("Max issues shown", min_value=10, max_value=1000, value=100, step=10)
+    
+    created_from = created_range[0] if len(created_range) > 0 else None
+    created_to = created_range[1] if len(created_range) > 1 else None
+    
+    # Fetch one extra row to know whether the result was truncated
+    issues = Issue().query(
+        statuses=statuses or None,
+        priorities=priorities or None,
+        project_ids=project_ids or None,
+        client_names=client_names or None,
+        created_from=created_from,
+        created_to=created_to,
+        min_age_days=min_age_days or None,
+        sort_by=sort_by,
+        limit=limit + 1
+    )
+    issues_df = pd.DataFrame(issues[:limit])
     
     if issues_df.empty:
         st.info("No issues found.")
         return
     
+    if len(issues) > limit:
+        st.caption(f"Showing the first {limit} matching issues. Narrow the filters to see more.")
+    
     for _, issue in issues_df.iterrows():
         with st.container():
             col1, col2 = st.columns([4, 1])
@@ -266,7 +394,10 @@ def display_issues():
 def add_issue():
     # Get projects for dropdown
     conn = get_db_connection()
-    projects_df = pd.read_sql_query("SELECT id, client_name, project_name FROM projects", conn)
+    projects_df = pd.read_sql_query("""
+        SELECT id, client_name, project_name FROM projects 
+        WHERE deleted_at IS NULL
+    """, conn)
     conn.close()
     
     if projects_df.empty:
@@ -289,9 +420,69 @@ def add_issue():
             st.success("Issue added successfully!")
             st.rerun()
 
+def show_timeline():
+    st.header("Portfolio Timeline")
+    
+    col1, col2, col3 = st.columns([2, 1, 2])
+    with col1:
+        window = st.date_input(
+            "Visible window",
+            value=(date.today() - timedelta(days=90), date.today() + timedelta(days=90))
+        )
+    with col2:
+        group_by = st.selectbox(
+            "Group by",
+            ["client_name", "phase_name"],
+            format_func={"client_name": "Client", "phase_name": "Phase"}.get,
+            help="Rows of the aggregated view shown when there are too many phases to draw individually"
+        )
+    with col3:
+        clients = sorted({project['client_name'] for project in Project().get_all()})
+        client_names = st.multiselect("Clients", clients)
+    
+    if len(window) != 2:
+        st.info("Select a start and end date.")
+        return
+    start_date, end_date = window
+    
+    phases = ProjectPhase().get_in_range(start_date, end_date, client_names or None)
+    if not phases:
+        st.info("No dated phases in this window.")
+        return
+    
+    if len(phases) > DETAIL_PHASE_LIMIT:
+        st.caption(f"{len(phases)} phases in this window - showing active phases per period. "
+                   "Narrow the window or filter clients to see individual phases.")
+    fig = build_timeline_figure(phases, start_date, end_date, group_by)
+    st.plotly_chart(fig, use_container_width=True)
+
 def show_analytics():
     st.header("Analytics & Reports")
     
+    figures = get_analytics_figures(ChangeLog().get_latest_version())
+    
+    for title, fig, payload_size in figures:
+        st.subheader(title)
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption(f"Chart payload: {payload_size / 1024:.1f} KB")
+    
+    with st.expander("Database Maintenance"):
+        scheduler = start_maintenance()
+        if st.button("Run maintenance now"):
+            scheduler.run_once(force=True)
+        runs = scheduler.get_recent_runs()
+        if runs:
+            st.dataframe(
+                pd.DataFrame(runs)[['started_date', 'task', 'status', 'details', 'duration_ms']],
+                hide_index=True,
+                use_container_width=True
+            )
+        else:
+            st.info("No maintenance has run yet.")
+
+@st.cache_resource(max_entries=4)
+def get_analytics_figures(data_version):
+    """Build the analytics figures once per data version, shared by all sessions"""
     conn = get_db_connection()
     
     # Project completion chart
@@ -300,56 +491,31 @@ def show_analytics():
                AVG(pp.completion_percentage) as overall_progress
         FROM projects p
         LEFT JOIN project_phases pp ON p.id = pp.project_id
+        WHERE p.deleted_at IS NULL
         GROUP BY p.id
     """, conn)
     
-    if not projects_df.empty:
-        st.subheader("Project Completion Status")
-        fig = px.bar(
-            projects_df,
-            x='overall_progress',
-            y='project_name',
-            orientation='h',
-            title="Project Progress Overview",
-            labels={'overall_progress': 'Completion %', 'project_name': 'Project'}
-        )
-        st.plotly_chart(fig, use_container_width=True)
-        
-        # Phase distribution
-        phases_df = pd.read_sql_query("""
-            SELECT phase_name, AVG(completion_percentage) as avg_completion
-            FROM project_phases
-            GROUP BY phase_name
-        """, conn)
-        
-        if not phases_df.empty:
-            st.subheader("Average Phase Completion")
-            fig2 = px.bar(
-                phases_df,
-                x='phase_name',
-                y='avg_completion',
-                title="Average Completion by Phase"
-            )
-            st.plotly_chart(fig2, use_container_width=True)
+    # Phase distribution
+    phases_df = pd.read_sql_query("""
+        SELECT pp.phase_name, AVG(pp.completion_percentage) as avg_completion
+        FROM project_phases pp
+        JOIN projects p ON pp.project_id = p.id
+        WHERE p.deleted_at IS NULL
+        GROUP BY pp.phase_name
+    """, conn)
     
     # Issues analytics
     issues_df = pd.read_sql_query("""
-        SELECT status, COUNT(*) as count
-        FROM issues
-        GROUP BY status
+        SELECT i.status, COUNT(*) as count
+        FROM issues i
+        JOIN projects p ON i.project_id = p.id
+        WHERE i.deleted_at IS NULL AND p.deleted_at IS NULL
+        GROUP BY i.status
     """, conn)
     
-    if not issues_df.empty:
-        st.subheader("Issues Status Distribution")
-        fig3 = px.pie(
-            issues_df,
-            values='count',
-            names='status',
-            title="Issues by Status"
-        )
-        st.plotly_chart(fig3, use_container_width=True)
-    
     conn.close()
+    figures = build_analytics_figures(projects_df, phases_df, issues_df)
+    return [(title, fig, figure_payload_size(fig)) for title, fig in figures]
 
 # Helper functions
 def create_project(client_name, project_name, start_date, current_phase, description):
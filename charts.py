@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+# Up to this many projects the progress chart shows one bar per project
+PROJECT_BAR_LIMIT = 50
+
+# Number of least complete projects shown once there are too many for one bar each
+TOP_N_PROJECTS = 25
+
+# Width of the completion bins in the progress histogram, in percent
+PROGRESS_BIN_WIDTH = 10
+
+def figure_payload_size(fig):
+    """Size in bytes of the JSON sent to the browser for a figure"""
+    return len(fig.to_json().encode("utf-8"))
+
+def build_analytics_figures(projects_df, phases_df, issues_df):
+    """Build the Analytics page figures as (title, figure) pairs, in display order
+
+    Large project counts are summarized server-side: a pre-binned histogram and the
+    least complete projects replace the one-bar-per-project chart, so the payload
+    stays small however many projects there are.
+    """
+    figures = []
+    if not projects_df.empty:
+        projects_df = projects_df.assign(overall_progress=projects_df['overall_progress'].fillna(0))
+        if len(projects_df) <= PROJECT_BAR_LIMIT:
+            figures.append(("Project Completion Status", px.bar(
+                projects_df,
+                x='overall_progress',
+                y='project_name',
+                orientation='h',
+                title="Project Progress Overview",
+                labels={'overall_progress': 'Completion %', 'project_name': 'Project'}
+            )))
+        else:
+            figures.append(("Project Completion Distribution", _build_progress_histogram(projects_df)))
+            figures.append((f"Least Complete Projects (top {TOP_N_PROJECTS})", _build_least_complete(projects_df)))
+
+    if not phases_df.empty:
+        figures.append(("Average Phase Completion", px.bar(
+            phases_df,
+            x='phase_name',
+            y='avg_completion',
+            title="Average Completion by Phase"
+        )))
+
+    if not issues_df.empty:
+        figures.append(("Issues Status Distribution", px.pie(
+            issues_df,
+            values='count',
+            names='status',
+            title="Issues by Status"
+        )))
+    return figures
+
+def _build_progress_histogram(projects_df):
+    """Project counts per completion bin, binned here rather than in the browser"""
+    edges = np.arange(0, 100 + PROGRESS_BIN_WIDTH, PROGRESS_BIN_WIDTH)
+    counts, _ = np.histogram(projects_df['overall_progress'].clip(0, 100), bins=edges)
+    bins_df = pd.DataFrame({
+        'bin': [f"{low}-{high}%" for low, high in zip(edges[:-1], edges[1:])],
+        'projects': counts
+    })
+    return px.bar(
+        bins_df,
+        x='bin',
+        y='projects',
+        title=f"Projects by Completion ({len(projects_df)} projects)",
+        labels={'bin': 'Completion %', 'projects': 'Projects'}
+    )
+
+def _build_least_complete(projects_df):
+    least_complete = projects_df.nsmallest(TOP_N_PROJECTS, 'overall_progress')
+    least_complete = least_complete.assign(
+        label=least_complete['client_name'] + " - " + least_complete['project_name']
+    )
+    fig = px.bar(
+        least_complete,
+        x='overall_progress',
+        y='label',
+        orientation='h',
+        title="Least Complete Projects",
+        labels={'overall_progress': 'Completion %', 'label': 'Project'}
+    )
+    fig.update_layout(yaxis=dict(autorange='reversed'))
+    return fig
\ No newline at end of file
@@ -3,16 +3,72 @@ import os
 
 DATABASE_NAME = "client_tracker.db"
 
+# Sort rank for issue priorities. Queries must use this exact expression for SQLite
+# to match it against the expression indexes created in init_database().
+PRIORITY_RANK_SQL = (
+    "CASE priority WHEN 'Critical' THEN 1 WHEN 'High' THEN 2 "
+    "WHEN 'Medium' THEN 3 WHEN 'Low' THEN 4 ELSE 5 END"
+)
+
+# (table, column holding the project id, condition for logging a DELETE, columns whose
+# UPDATE is logged or None for all) for every table tracked by change_log. Rows removed
+# by the background purger were already logged when they were soft deleted, so their
+# hard DELETE is not logged again. SLA bookkeeping columns are not user-visible changes.
+CHANGE_LOG_TABLES = [
+    ("projects", "id", "OLD.deleted_at IS NULL", None),
+    ("project_phases", "project_id",
+     "EXISTS (SELECT 1 FROM projects WHERE id = OLD.project_id AND deleted_at IS NULL)", None),
+    ("issues", "project_id",
+     "OLD.deleted_at IS NULL AND "
+     "EXISTS (SELECT 1 FROM projects WHERE id = OLD.project_id AND deleted_at IS NULL)",
+     ["project_id", "title", "description", "priority", "status", "resolved_date", "deleted_at"]),
+]
+
+def _change_log_triggers():
+    """Build the INSERT/UPDATE/DELETE triggers that append to change_log"""
+    triggers = []
+    for table_name, project_column, delete_condition, update_columns in CHANGE_LOG_TABLES:
+        for operation, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            trigger_name = f"trg_{table_name}_{operation.lower()}_change_log"
+            when = f"WHEN {delete_condition}" if operation == "DELETE" else ""
+            event = operation
+            if operation == "UPDATE" and update_columns:
+                event = f"UPDATE OF {', '.join(update_columns)}"
+            triggers.append((trigger_name, f"""
+                CREATE TRIGGER {trigger_name}
+                AFTER {event} ON {table_name}
+                {when}
+                BEGIN
+                    INSERT INTO change_log (table_name, row_id, project_id, operation)
+                    VALUES ('{table_name}', {row}.id, {row}.{project_column}, '{operation}');
+                END
+            """))
+    return triggers
+
+CHANGE_LOG_TRIGGERS = _change_log_triggers()
+
 def get_db_connection():
     """Get database connection"""
     conn = sqlite3.connect(DATABASE_NAME)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
     return conn
 
+def _add_column_if_missing(conn, table_name, column_name, column_definition):
+    """Add a column to an existing table created by an older version of the app"""
+    columns = [row['name'] for row in conn.execute(f"PRAGMA table_info({table_name})")]
+    if column_name not in columns:
+        conn.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_definition}")
+
 def init_database():
     """Initialize database with required tables"""
     conn = get_db_connection()
     
+    # Only takes effect on a new, empty database - maintenance.py converts older files
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    # WAL lets readers keep going while a writer (or checkpoint) is active
+    conn.execute("PRAGMA journal_mode = WAL")
+    
     # Create projects table
     conn.execute("""
         CREATE TABLE IF NOT EXISTS projects (
@@ -23,7 +79,8 @@ def init_database():
             current_phase TEXT NOT NULL,
             description TEXT,
             created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            deleted_at TIMESTAMP
         )
     """)
     
@@ -54,20 +111,102 @@ def init_database():
             created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             resolved_date TIMESTAMP,
+            deleted_at TIMESTAMP,
+            sla_at_risk_date TIMESTAMP,
+            sla_due_date TIMESTAMP,
+            FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
+        )
+    """)
+    
+    # Soft delete columns for databases created before they existed
+    _add_column_if_missing(conn, "projects", "deleted_at", "TIMESTAMP")
+    _add_column_if_missing(conn, "issues", "deleted_at", "TIMESTAMP")
+    _add_column_if_missing(conn, "issues", "sla_at_risk_date", "TIMESTAMP")
+    _add_column_if_missing(conn, "issues", "sla_due_date", "TIMESTAMP")
+    
+    # SLA counters per project, correct as of sla_state.evaluated_until (see sla.py)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sla_counters (
+            project_id INTEGER PRIMARY KEY,
+            open_count INTEGER NOT NULL DEFAULT 0,
+            at_risk_count INTEGER NOT NULL DEFAULT 0,
+            breached_count INTEGER NOT NULL DEFAULT 0,
             FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
         )
     """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sla_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            evaluated_until TIMESTAMP,
+            targets TEXT
+        )
+    """)
+    
+    # Record of every maintenance task run (see maintenance.py)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS maintenance_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task TEXT NOT NULL,
+            status TEXT NOT NULL,
+            details TEXT,
+            change_version INTEGER,
+            started_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            duration_ms INTEGER
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_maintenance_runs_task ON maintenance_runs(task, status, id)")
+    
+    # Create change log table - every write to the tracked tables appends a row
+    # so pages can ask for "changes since version N" instead of re-querying
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            project_id INTEGER NOT NULL,
+            operation TEXT NOT NULL,
+            changed_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # Triggers are recreated on every start so existing databases pick up changes
+    for trigger_name, trigger_sql in CHANGE_LOG_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger_name}")
+        conn.execute(trigger_sql)
     
     # Create indexes for better performance
     conn.execute("CREATE INDEX IF NOT EXISTS idx_project_phases_project_id ON project_phases(project_id)")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_issues_project_id ON issues(project_id)")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_issues_status ON issues(status)")
     
+    # Partial indexes - live rows for reads, soft-deleted rows for the purger
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_live ON projects(created_date) WHERE deleted_at IS NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_deleted ON projects(deleted_at) WHERE deleted_at IS NOT NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_issues_live_project ON issues(project_id, created_date) WHERE deleted_at IS NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_issues_deleted ON issues(deleted_at) WHERE deleted_at IS NOT NULL")
+    
+    # Indexes backing the Issue.query filters and sort orders
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_issues_live_created ON issues(created_date) WHERE deleted_at IS NULL")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_issues_live_status_priority ON issues(status, {PRIORITY_RANK_SQL}, created_date) WHERE deleted_at IS NULL")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_issues_live_project_priority ON issues(project_id, {PRIORITY_RANK_SQL}, created_date) WHERE deleted_at IS NULL")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_issues_open_priority ON issues({PRIORITY_RANK_SQL}, created_date) WHERE deleted_at IS NULL AND status != 'Resolved'")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_client ON projects(client_name) WHERE deleted_at IS NULL")
+    
+    # Time-ordered indexes on open issues for SLATracker.advance()
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_issues_open_sla_at_risk ON issues(sla_at_risk_date) WHERE deleted_at IS NULL AND status != 'Resolved'")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_issues_open_sla_due ON issues(sla_due_date) WHERE deleted_at IS NULL AND status != 'Resolved'")
+    
+    # Date-range indexes for the portfolio timeline - by start for phases starting in
+    # the window, by end for phases that started earlier and are still running in it
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_project_phases_dates ON project_phases(start_date, end_date) WHERE start_date IS NOT NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_project_phases_end ON project_phases(end_date, start_date) WHERE start_date IS NOT NULL")
+    
     conn.commit()
     conn.close()
 
 def reset_database():
     """Reset database - useful for testing"""
-    if os.path.exists(DATABASE_NAME):
-        os.remove(DATABASE_NAME)
+    for path in (DATABASE_NAME, f"{DATABASE_NAME}-wal", f"{DATABASE_NAME}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
     init_database()
\ No newline at end of file
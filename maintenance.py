@@ -0,0 +1,208 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from database import get_db_connection
+from models import ChangeLog
+
+# Local hours during which only short, chunked tasks run
+PEAK_HOURS = range(8, 19)
+
+# Re-gather planner statistics after this many logged changes, or at least this often
+ANALYZE_CHANGE_THRESHOLD = 5000
+ANALYZE_MAX_AGE_HOURS = 24
+# Rows sampled per index by ANALYZE, which keeps it fast on large tables
+ANALYSIS_LIMIT = 400
+
+# Reclaim free pages once there are this many and they make up this fraction of the file
+FREELIST_MIN_PAGES = 256
+FREELIST_MIN_RATIO = 0.1
+# Pages released per incremental_vacuum step, and the pause between steps
+VACUUM_STEP_PAGES = 200
+STEP_PAUSE_SECONDS = 0.05
+
+# Checkpoint once the WAL file has grown past this size
+CHECKPOINT_MIN_WAL_BYTES = 1024 * 1024
+
+# Change log entries kept when pruning
+CHANGE_LOG_KEEP = 100000
+
+class MaintenanceScheduler:
+    """Runs ANALYZE, WAL checkpoints, incremental vacuum and change log pruning
+
+    Each task checks its own threshold and is skipped when not due. During peak hours
+    only short work runs: checkpoints are PASSIVE, vacuuming happens in small steps,
+    and converting an old file to incremental auto-vacuum waits for off-peak hours.
+    Every run is recorded in maintenance_runs with what it did and how long it took.
+    """
+
+    def __init__(self, interval_seconds=300, peak_hours=PEAK_HOURS):
+        self.interval_seconds = interval_seconds
+        self.peak_hours = peak_hours
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def is_peak(self):
+        return datetime.now().hour in self.peak_hours
+
+    def run_once(self, force=False):
+        """Run every task that is due (or all of them if force) and return the records"""
+        records = []
+        for task, method in (
+            ("analyze", self._analyze),
+            ("checkpoint", self._checkpoint),
+            ("incremental_vacuum", self._incremental_vacuum),
+            ("prune_change_log", self._prune_change_log),
+        ):
+            started = time.perf_counter()
+            try:
+                status, details = method(force)
+            except sqlite3.Error as e:
+                # Usually "database is locked" - try again on the next run
+                status, details = "error", str(e)
+            if status == "skipped" and not force:
+                continue
+            duration_ms = int((time.perf_counter() - started) * 1000)
+            records.append(self._record(task, status, details, duration_ms))
+        return records
+
+    def get_recent_runs(self, limit=20):
+        """Get the most recent maintenance runs, newest first"""
+        conn = get_db_connection()
+        try:
+            runs = conn.execute("""
+                SELECT * FROM maintenance_runs
+                ORDER BY id DESC
+                LIMIT ?
+            """, (limit,)).fetchall()
+        finally:
+            conn.close()
+        return [dict(run) for run in runs]
+
+    def start(self):
+        """Run the scheduler in a background thread every interval_seconds"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name="maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+
+    def _loop(self):
+        while not self._stop_event.wait(self.interval_seconds):
+            try:
+                self.run_once()
+            except (sqlite3.Error, OSError):
+                # Keep the thread alive; whatever failed runs again next interval
+                continue
+
+    def _record(self, task, status, details, duration_ms):
+        record = {"task": task, "status": status, "details": details, "duration_ms": duration_ms}
+        conn = get_db_connection()
+        try:
+            change_version = ChangeLog().get_latest_version()
+            conn.execute("""
+                INSERT INTO maintenance_runs (task, status, details, change_version, duration_ms)
+                VALUES (?, ?, ?, ?, ?)
+            """, (task, status, details, change_version, duration_ms))
+            conn.commit()
+        except sqlite3.OperationalError:
+            # The task still ran; only its entry in maintenance_runs is lost
+            pass
+        finally:
+            conn.close()
+        return record
+
+    def _last_success(self, conn, task):
+        return conn.execute("""
+            SELECT change_version, started_date,
+                   (julianday('now') - julianday(started_date)) * 24 AS age_hours
+            FROM maintenance_runs
+            WHERE task = ? AND status = 'ok'
+            ORDER BY id DESC
+            LIMIT 1
+        """, (task,)).fetchone()
+
+    def _analyze(self, force):
+        conn = get_db_connection()
+        try:
+            last = self._last_success(conn, "analyze")
+            last_version = (last['change_version'] or 0) if last else 0
+            changes = ChangeLog().get_latest_version() - last_version
+            if not force and last and changes < ANALYZE_CHANGE_THRESHOLD and last['age_hours'] < ANALYZE_MAX_AGE_HOURS:
+                return "skipped", f"{changes} changes since last run"
+            conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+            conn.execute("ANALYZE")
+            conn.execute("PRAGMA optimize")
+            conn.commit()
+        finally:
+            conn.close()
+        return "ok", f"statistics refreshed after {changes} changes"
+
+    def _checkpoint(self, force):
+        conn = get_db_connection()
+        try:
+            if conn.execute("PRAGMA journal_mode").fetchone()[0] != "wal":
+                return "skipped", "not in WAL mode"
+            database_file = conn.execute("PRAGMA database_list").fetchone()['file']
+            wal_file = f"{database_file}-wal"
+            wal_bytes = os.path.getsize(wal_file) if os.path.exists(wal_file) else 0
+            if not force and wal_bytes < CHECKPOINT_MIN_WAL_BYTES:
+                return "skipped", f"WAL is {wal_bytes} bytes"
+            # PASSIVE never waits for readers or writers; TRUNCATE also shrinks the WAL file
+            mode = "PASSIVE" if self.is_peak() else "TRUNCATE"
+            busy, log_frames, checkpointed = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        finally:
+            conn.close()
+        if busy:
+            return "ok", f"{mode}: WAL was {wal_bytes} bytes, {checkpointed} of {log_frames} frames checkpointed (busy)"
+        return "ok", f"{mode}: WAL was {wal_bytes} bytes"
+
+    def _incremental_vacuum(self, force):
+        conn = get_db_connection()
+        try:
+            freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            if not force and (freelist < FREELIST_MIN_PAGES or freelist < page_count * FREELIST_MIN_RATIO):
+                return "skipped", f"{freelist} of {page_count} pages free"
+
+            auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            if auto_vacuum != 2:
+                # Switching to incremental needs one full VACUUM, which locks the whole file
+                if self.is_peak():
+                    return "skipped", "full VACUUM to enable incremental auto-vacuum waits for off-peak hours"
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("VACUUM")
+                return "ok", f"full VACUUM released {freelist} pages and enabled incremental auto-vacuum"
+
+            released = 0
+            while freelist > 0 and not self._stop_event.is_set():
+                # executescript steps the pragma to completion; execute() frees a single page
+                conn.executescript(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES});")
+                remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if remaining >= freelist:
+                    break
+                released += freelist - remaining
+                freelist = remaining
+                self._stop_event.wait(STEP_PAUSE_SECONDS)
+        finally:
+            conn.close()
+        return "ok", f"released {released} pages, {freelist} still free"
+
+    def _prune_change_log(self, force):
+        conn = get_db_connection()
+        try:
+            row = conn.execute("SELECT MIN(version) AS oldest, MAX(version) AS latest FROM change_log").fetchone()
+        finally:
+            conn.close()
+        retained = (row['latest'] - row['oldest'] + 1) if row['latest'] else 0
+        if not force and retained <= CHANGE_LOG_KEEP:
+            return "skipped", f"{retained} entries retained"
+        ChangeLog().prune(CHANGE_LOG_KEEP)
+        return "ok", f"pruned change log to the latest {CHANGE_LOG_KEEP} entries"
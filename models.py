@@ -1,5 +1,8 @@
-from database import get_db_connection
+from database import get_db_connection, PRIORITY_RANK_SQL
+from sla import SLATracker
 from datetime import datetime
+import sqlite3
+import threading
 
 class Project:
     def __init__(self):
@@ -20,17 +23,47 @@ class Project:
     def get_all(self):
         """Get all projects"""
         conn = get_db_connection()
-        projects = conn.execute("SELECT * FROM projects ORDER BY created_date DESC").fetchall()
+        projects = conn.execute("""
+            SELECT * FROM projects 
+            WHERE deleted_at IS NULL 
+            ORDER BY created_date DESC
+        """).fetchall()
         conn.close()
         return [dict(project) for project in projects]
     
     def get_by_id(self, project_id):
         """Get project by ID"""
         conn = get_db_connection()
-        project = conn.execute("SELECT * FROM projects WHERE id = ?", (project_id,)).fetchone()
+        project = conn.execute("""
+            SELECT * FROM projects 
+            WHERE id = ? AND deleted_at IS NULL
+        """, (project_id,)).fetchone()
         conn.close()
         return dict(project) if project else None
     
+    def get_overview(self, project_ids=None):
+        """Get projects with their overall progress, optionally limited to the given IDs"""
+        conn = get_db_connection()
+        query = """
+            SELECT p.*, 
+                   AVG(pp.completion_percentage) as overall_progress
+            FROM projects p
+            LEFT JOIN project_phases pp ON p.id = pp.project_id
+            WHERE p.deleted_at IS NULL
+        """
+        params = ()
+        if project_ids is not None:
+            project_ids = list(project_ids)
+            if not project_ids:
+                conn.close()
+                return []
+            query += f" AND p.id IN ({', '.join('?' for _ in project_ids)})"
+            params = tuple(project_ids)
+        query += " GROUP BY p.id"
+        projects = conn.execute(query, params).fetchall()
+        conn.close()
+        return [dict(project) for project in projects]
+    
     def update(self, project_id, client_name, project_name, start_date, current_phase, description=""):
         """Update project"""
         conn = get_db_connection()
@@ -44,12 +77,14 @@ class Project:
         conn.close()
     
     def delete(self, project_id):
-        """Delete project and related data"""
+        """Soft delete project - related phases and issues are removed later by the Purger"""
         conn = get_db_connection()
-        # Delete related phases and issues (CASCADE should handle this, but being explicit)
-        conn.execute("DELETE FROM project_phases WHERE project_id = ?", (project_id,))
-        conn.execute("DELETE FROM issues WHERE project_id = ?", (project_id,))
-        conn.execute("DELETE FROM projects WHERE id = ?", (project_id,))
+        conn.execute("""
+            UPDATE projects 
+            SET deleted_at = CURRENT_TIMESTAMP, updated_date = CURRENT_TIMESTAMP
+            WHERE id = ? AND deleted_at IS NULL
+        """, (project_id,))
+        SLATracker().refresh_project(conn, project_id)
         conn.commit()
         conn.close()
 
@@ -73,13 +108,54 @@ class ProjectPhase:
         """Get all phases for a project"""
         conn = get_db_connection()
         phases = conn.execute("""
-            SELECT * FROM project_phases 
-            WHERE project_id = ? 
-            ORDER BY phase_order
+            SELECT pp.* FROM project_phases pp
+            JOIN projects p ON pp.project_id = p.id
+            WHERE pp.project_id = ? AND p.deleted_at IS NULL
+            ORDER BY pp.phase_order
         """, (project_id,)).fetchall()
         conn.close()
         return [dict(phase) for phase in phases]
     
+    def get_in_range(self, start_date, end_date, client_names=None):
+        """Get dated phases overlapping the given window, with their project and client
+        
+        Phases without an end date are treated as running until today, or until their
+        start if that is later. The three branches each read one index range: phases
+        starting inside the window, phases that started earlier and end inside or after
+        it, and open-ended phases. The second range covers every phase ending after the
+        window starts, so it is small for windows near today and grows for windows far
+        in the past.
+        """
+        conn = get_db_connection()
+        query = """
+            SELECT pp.id, pp.project_id, pp.phase_name, pp.phase_order,
+                   pp.completion_percentage, pp.start_date,
+                   COALESCE(pp.end_date, MAX(pp.start_date, date('now'))) AS end_date,
+                   p.client_name, p.project_name
+            FROM project_phases pp
+            JOIN projects p ON pp.project_id = p.id
+            WHERE pp.id IN (
+                SELECT id FROM project_phases
+                WHERE start_date >= :start AND start_date <= :end
+                UNION ALL
+                SELECT id FROM project_phases INDEXED BY idx_project_phases_end
+                WHERE start_date IS NOT NULL AND end_date >= :start AND start_date < :start
+                UNION ALL
+                SELECT id FROM project_phases
+                WHERE start_date IS NOT NULL AND end_date IS NULL
+                  AND start_date < :start AND MAX(start_date, date('now')) >= :start
+            )
+              AND p.deleted_at IS NULL
+        """
+        params = {"start": str(start_date), "end": str(end_date)}
+        if client_names:
+            query += f" AND p.client_name IN ({', '.join(f':client_{i}' for i in range(len(client_names)))})"
+            params.update({f"client_{i}": client_name for i, client_name in enumerate(client_names)})
+        query += " ORDER BY p.client_name, p.project_name, pp.phase_order"
+        phases = conn.execute(query, params).fetchall()
+        conn.close()
+        return [dict(phase) for phase in phases]
+    
     def update_progress(self, phase_id, completion_percentage):
         """Update phase completion percentage"""
         conn = get_db_connection()
@@ -115,18 +191,29 @@ class ProjectPhase:
         conn.commit()
         conn.close()
 
+# Sort orders accepted by Issue.query
+ISSUE_SORT_ORDERS = {
+    "priority": f"{PRIORITY_RANK_SQL.replace('priority', 'i.priority', 1)}, i.created_date",
+    "newest": "i.created_date DESC",
+    "oldest": "i.created_date",
+}
+
 class Issue:
     def __init__(self):
         pass
     
     def create(self, project_id, title, description="", priority="Medium", status="Open"):
         """Create a new issue"""
+        sla_tracker = SLATracker()
+        at_risk_offset, due_offset = sla_tracker.get_offsets(priority)
         conn = get_db_connection()
         cursor = conn.execute("""
-            INSERT INTO issues (project_id, title, description, priority, status)
-            VALUES (?, ?, ?, ?, ?)
-        """, (project_id, title, description, priority, status))
+            INSERT INTO issues (project_id, title, description, priority, status,
+                                sla_at_risk_date, sla_due_date)
+            VALUES (?, ?, ?, ?, ?, datetime('now', ?), datetime('now', ?))
+        """, (project_id, title, description, priority, status, at_risk_offset, due_offset))
         issue_id = cursor.lastrowid
+        sla_tracker.refresh_project(conn, project_id)
         conn.commit()
         conn.close()
         return issue_id
@@ -138,6 +225,7 @@ class Issue:
             SELECT i.*, p.client_name, p.project_name
             FROM issues i
             JOIN projects p ON i.project_id = p.id
+            WHERE i.deleted_at IS NULL AND p.deleted_at IS NULL
             ORDER BY i.created_date DESC
         """).fetchall()
         conn.close()
@@ -147,15 +235,84 @@ class Issue:
         """Get all issues for a project"""
         conn = get_db_connection()
         issues = conn.execute("""
-            SELECT * FROM issues 
-            WHERE project_id = ? 
-            ORDER BY created_date DESC
+            SELECT i.* FROM issues i
+            JOIN projects p ON i.project_id = p.id
+            WHERE i.project_id = ? AND i.deleted_at IS NULL AND p.deleted_at IS NULL
+            ORDER BY i.created_date DESC
         """, (project_id,)).fetchall()
         conn.close()
         return [dict(issue) for issue in issues]
     
+    def query(self, statuses=None, priorities=None, project_ids=None, client_names=None,
+              open_only=False, created_from=None, created_to=None, resolved_from=None,
+              resolved_to=None, min_age_days=None, max_age_days=None, sort_by="priority",
+              limit=100, offset=0):
+        """Get issues matching the given filters, sorted and limited
+        
+        Every filter is optional and they are combined with AND. Dates are inclusive,
+        ages are in days since the issue was created. sort_by is one of ISSUE_SORT_ORDERS.
+        """
+        if sort_by not in ISSUE_SORT_ORDERS:
+            raise ValueError(f"Unknown sort order: {sort_by}")
+        
+        conditions = ["i.deleted_at IS NULL", "p.deleted_at IS NULL"]
+        params = []
+        
+        def add_in(column, values):
+            values = list(values)
+            conditions.append(f"{column} IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+        
+        if statuses is not None:
+            add_in("i.status", statuses)
+            if "Resolved" not in statuses:
+                open_only = True
+        # Written as a literal so SQLite can use the open issues partial index
+        if open_only:
+            conditions.append("i.status != 'Resolved'")
+        if priorities is not None:
+            add_in("i.priority", priorities)
+        if project_ids is not None:
+            add_in("i.project_id", project_ids)
+        if client_names is not None:
+            add_in("p.client_name", client_names)
+        if created_from:
+            conditions.append("i.created_date >= ?")
+            params.append(str(created_from))
+        if created_to:
+            conditions.append("i.created_date < date(?, '+1 day')")
+            params.append(str(created_to))
+        if resolved_from:
+            conditions.append("i.resolved_date >= ?")
+            params.append(str(resolved_from))
+        if resolved_to:
+            conditions.append("i.resolved_date < date(?, '+1 day')")
+            params.append(str(resolved_to))
+        if min_age_days is not None:
+            conditions.append("i.created_date <= datetime('now', ?)")
+            params.append(f"-{int(min_age_days)} days")
+        if max_age_days is not None:
+            conditions.append("i.created_date >= datetime('now', ?)")
+            params.append(f"-{int(max_age_days)} days")
+        
+        query = f"""
+            SELECT i.*, p.client_name, p.project_name
+            FROM issues i
+            JOIN projects p ON i.project_id = p.id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY {ISSUE_SORT_ORDERS[sort_by]}
+            LIMIT ? OFFSET ?
+        """
+        params.extend([limit, offset])
+        
+        conn = get_db_connection()
+        issues = conn.execute(query, params).fetchall()
+        conn.close()
+        return [dict(issue) for issue in issues]
+    
     def update_status(self, issue_id, status):
         """Update issue status"""
+        sla_tracker = SLATracker()
         conn = get_db_connection()
         resolved_date = datetime.now() if status == "Resolved" else None
         conn.execute("""
@@ -163,25 +320,194 @@ class Issue:
             SET status = ?, resolved_date = ?, updated_date = CURRENT_TIMESTAMP
             WHERE id = ?
         """, (status, resolved_date, issue_id))
+        if status != "Resolved":
+            # Issues resolved before SLA tracking existed have no SLA dates yet
+            conn.execute(f"""
+                UPDATE issues 
+                SET sla_at_risk_date = datetime(created_date, {sla_tracker.offset_case_sql(0)}),
+                    sla_due_date = datetime(created_date, {sla_tracker.offset_case_sql(1)})
+                WHERE id = ?
+            """, (issue_id,))
+        sla_tracker.refresh_issue_project(conn, issue_id)
         conn.commit()
         conn.close()
     
     def update(self, issue_id, title, description, priority, status):
         """Update issue details"""
+        sla_tracker = SLATracker()
+        at_risk_offset, due_offset = sla_tracker.get_offsets(priority)
         conn = get_db_connection()
         resolved_date = datetime.now() if status == "Resolved" else None
         conn.execute("""
             UPDATE issues 
             SET title = ?, description = ?, priority = ?, status = ?, 
-                resolved_date = ?, updated_date = CURRENT_TIMESTAMP
+                resolved_date = ?, updated_date = CURRENT_TIMESTAMP,
+                sla_at_risk_date = datetime(created_date, ?),
+                sla_due_date = datetime(created_date, ?)
             WHERE id = ?
-        """, (title, description, priority, status, resolved_date, issue_id))
+        """, (title, description, priority, status, resolved_date, at_risk_offset, due_offset, issue_id))
+        sla_tracker.refresh_issue_project(conn, issue_id)
         conn.commit()
         conn.close()
     
     def delete(self, issue_id):
-        """Delete issue"""
+        """Soft delete issue - the row is removed later by the Purger"""
         conn = get_db_connection()
-        conn.execute("DELETE FROM issues WHERE id = ?", (issue_id,))
+        conn.execute("""
+            UPDATE issues 
+            SET deleted_at = CURRENT_TIMESTAMP, updated_date = CURRENT_TIMESTAMP
+            WHERE id = ? AND deleted_at IS NULL
+        """, (issue_id,))
+        SLATracker().refresh_issue_project(conn, issue_id)
         conn.commit()
-        conn.close()
\ No newline at end of file
+        conn.close()
+
+# Statements run by the Purger, in order. Children go first so that by the time a
+# project row is removed there is nothing left for the foreign key cascade to do.
+PURGE_STEPS = [
+    """
+        DELETE FROM issues WHERE id IN (
+            SELECT id FROM issues WHERE deleted_at IS NOT NULL LIMIT ?
+        )
+    """,
+    """
+        DELETE FROM issues WHERE id IN (
+            SELECT i.id FROM projects p
+            JOIN issues i ON i.project_id = p.id
+            WHERE p.deleted_at IS NOT NULL LIMIT ?
+        )
+    """,
+    """
+        DELETE FROM project_phases WHERE id IN (
+            SELECT pp.id FROM projects p
+            JOIN project_phases pp ON pp.project_id = p.id
+            WHERE p.deleted_at IS NOT NULL LIMIT ?
+        )
+    """,
+    """
+        DELETE FROM projects WHERE id IN (
+            SELECT id FROM projects WHERE deleted_at IS NOT NULL LIMIT ?
+        )
+    """,
+]
+
+class Purger:
+    """Hard-deletes soft-deleted rows in small batches so writers are never blocked for long"""
+    
+    def __init__(self, chunk_size=500, pause_seconds=0.1, interval_seconds=60):
+        self.chunk_size = chunk_size
+        self.pause_seconds = pause_seconds
+        self.interval_seconds = interval_seconds
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def purge_chunk(self):
+        """Delete one batch of soft-deleted rows and return how many were removed"""
+        conn = get_db_connection()
+        try:
+            removed = 0
+            for statement in PURGE_STEPS:
+                removed = conn.execute(statement, (self.chunk_size,)).rowcount
+                if removed:
+                    break
+            conn.commit()
+        finally:
+            conn.close()
+        return removed
+    
+    def run(self, max_chunks=None):
+        """Purge until nothing is left (or max_chunks batches), pausing between batches"""
+        total = 0
+        chunks = 0
+        while not self._stop_event.is_set():
+            try:
+                removed = self.purge_chunk()
+            except sqlite3.OperationalError:
+                # Usually "database is locked" - the rest waits for the next run
+                break
+            if not removed:
+                break
+            total += removed
+            chunks += 1
+            if max_chunks and chunks >= max_chunks:
+                break
+            self._stop_event.wait(self.pause_seconds)
+        return total
+    
+    def start(self):
+        """Run the purger in a background thread every interval_seconds"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name="purger", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the background thread"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+    
+    def _loop(self):
+        while not self._stop_event.is_set():
+            self.run()
+            self._stop_event.wait(self.interval_seconds)
+
+class ChangeLog:
+    def __init__(self):
+        pass
+    
+    def get_latest_version(self):
+        """Get the most recent change version (0 if nothing has been recorded)"""
+        conn = get_db_connection()
+        try:
+            row = conn.execute("SELECT MAX(version) AS version FROM change_log").fetchone()
+        finally:
+            conn.close()
+        return row['version'] or 0
+    
+    def get_changes_since(self, version, limit=None):
+        """Get changes recorded after the given version, oldest first"""
+        conn = get_db_connection()
+        query = """
+            SELECT * FROM change_log 
+            WHERE version > ? 
+            ORDER BY version
+        """
+        params = (version,)
+        if limit:
+            query += " LIMIT ?"
+            params += (limit,)
+        changes = conn.execute(query, params).fetchall()
+        conn.close()
+        return [dict(change) for change in changes]
+    
+    def get_changed_projects(self, version):
+        """Get the IDs of projects touched after the given version
+        
+        Returns None when entries after that version have already been pruned,
+        in which case the caller has to reload everything.
+        """
+        conn = get_db_connection()
+        oldest = conn.execute("SELECT MIN(version) AS version FROM change_log").fetchone()['version']
+        if oldest is not None and version < oldest - 1:
+            conn.close()
+            return None
+        rows = conn.execute("""
+            SELECT DISTINCT project_id FROM change_log 
+            WHERE version > ?
+        """, (version,)).fetchall()
+        conn.close()
+        return {row['project_id'] for row in rows}
+    
+    def prune(self, keep_last=10000):
+        """Delete all but the most recent change log entries"""
+        conn = get_db_connection()
+        try:
+            conn.execute("""
+                DELETE FROM change_log 
+                WHERE version <= (SELECT MAX(version) FROM change_log) - ?
+            """, (keep_last,))
+            conn.commit()
+        finally:
+            conn.close()
\ No newline at end of file
@@ -84,7 +84,11 @@ def create_sample_data():
                 # Future phases
                 completion = 0
             
-            phase_obj.create(project_id, phase_name, order, completion)
+            phase_id = phase_obj.create(project_id, phase_name, order, completion)
+            
+            # Planned dates - each phase takes 30 days
+            phase_start = project_data["start_date"] + timedelta(days=30 * i)
+            phase_obj.update_dates(phase_id, phase_start, phase_start + timedelta(days=29))
     
     # Create sample issues
     sample_issues = [
@@ -0,0 +1,171 @@
+import json
+from database import get_db_connection
+
+# Hours allowed from creation to resolution, per priority. This and
+# SLA_AT_RISK_FRACTION are the only place targets are configured: every write path
+# uses them, and advance() rebuilds all SLA dates when they change.
+SLA_TARGETS_HOURS = {
+    "Critical": 4,
+    "High": 24,
+    "Medium": 72,
+    "Low": 168,
+}
+
+# An issue is "at risk" once this fraction of its SLA target has elapsed
+SLA_AT_RISK_FRACTION = 0.75
+
+class SLATracker:
+    """Keeps per-project counters of open, at-risk and breached issues up to date
+
+    Every open issue stores the moment it becomes at risk and the moment it breaches.
+    The counters in sla_counters are correct as of the watermark in sla_state, and
+    advance() moves the watermark forward by only looking at issues that crossed a
+    threshold in between, using the time-ordered partial indexes on open issues.
+    Issue writes call refresh_project() so the counters never need a full recount.
+    """
+
+    def get_offsets(self, priority):
+        """Get the (at risk, due) datetime() modifiers for a priority"""
+        target_minutes = int(SLA_TARGETS_HOURS.get(priority, max(SLA_TARGETS_HOURS.values())) * 60)
+        at_risk_minutes = int(target_minutes * SLA_AT_RISK_FRACTION)
+        return f"+{at_risk_minutes} minutes", f"+{target_minutes} minutes"
+
+    def offset_case_sql(self, index):
+        """CASE expression over the priority column picking the at risk (0) or due (1) offset"""
+        cases = " ".join(
+            f"WHEN '{priority}' THEN '{self.get_offsets(priority)[index]}'"
+            for priority in SLA_TARGETS_HOURS
+        )
+        return f"CASE priority {cases} ELSE '{self.get_offsets(None)[index]}' END"
+
+    def _get_state(self, conn):
+        row = conn.execute("SELECT evaluated_until, targets FROM sla_state WHERE id = 1").fetchone()
+        return (row['evaluated_until'], row['targets']) if row else (None, None)
+
+    def _targets_key(self):
+        return json.dumps({"targets_hours": SLA_TARGETS_HOURS, "at_risk_fraction": SLA_AT_RISK_FRACTION}, sort_keys=True)
+
+    def refresh_project(self, conn, project_id):
+        """Recount one project's counters as of the watermark, inside the caller's transaction"""
+        evaluated_until, _ = self._get_state(conn)
+        if evaluated_until is None:
+            # No watermark yet - the next advance() rebuilds everything
+            return
+        conn.execute("""
+            INSERT OR REPLACE INTO sla_counters (project_id, open_count, at_risk_count, breached_count)
+            SELECT p.id,
+                   COUNT(i.id),
+                   COALESCE(SUM(i.sla_at_risk_date <= :w AND i.sla_due_date > :w), 0),
+                   COALESCE(SUM(i.sla_due_date <= :w), 0)
+            FROM projects p
+            LEFT JOIN issues i ON i.project_id = p.id
+                AND i.deleted_at IS NULL AND i.status != 'Resolved'
+            WHERE p.id = :project_id AND p.deleted_at IS NULL
+            GROUP BY p.id
+        """, {"w": evaluated_until, "project_id": project_id})
+        conn.execute("""
+            DELETE FROM sla_counters
+            WHERE project_id = ?
+              AND project_id NOT IN (SELECT id FROM projects WHERE deleted_at IS NULL)
+        """, (project_id,))
+
+    def refresh_issue_project(self, conn, issue_id):
+        """Recount the counters of the project an issue belongs to"""
+        row = conn.execute("SELECT project_id FROM issues WHERE id = ?", (issue_id,)).fetchone()
+        if row:
+            self.refresh_project(conn, row['project_id'])
+
+    def rebuild(self):
+        """Recompute every open issue's SLA dates and all counters from scratch"""
+        conn = get_db_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        now = conn.execute("SELECT datetime('now') AS now").fetchone()['now']
+        conn.execute(f"""
+            UPDATE issues
+            SET sla_at_risk_date = datetime(created_date, {self.offset_case_sql(0)}),
+                sla_due_date = datetime(created_date, {self.offset_case_sql(1)})
+            WHERE deleted_at IS NULL AND status != 'Resolved'
+        """)
+        conn.execute("DELETE FROM sla_counters")
+        conn.execute("""
+            INSERT INTO sla_counters (project_id, open_count, at_risk_count, breached_count)
+            SELECT i.project_id,
+                   COUNT(*),
+                   SUM(i.sla_at_risk_date <= :w AND i.sla_due_date > :w),
+                   SUM(i.sla_due_date <= :w)
+            FROM issues i
+            JOIN projects p ON i.project_id = p.id
+            WHERE i.deleted_at IS NULL AND i.status != 'Resolved' AND p.deleted_at IS NULL
+            GROUP BY i.project_id
+        """, {"w": now})
+        conn.execute("""
+            INSERT OR REPLACE INTO sla_state (id, evaluated_until, targets)
+            VALUES (1, ?, ?)
+        """, (now, self._targets_key()))
+        conn.commit()
+        conn.close()
+
+    def advance(self):
+        """Bring the counters up to the current time"""
+        conn = get_db_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        evaluated_until, targets = self._get_state(conn)
+        if evaluated_until is None or targets != self._targets_key():
+            conn.rollback()
+            conn.close()
+            self.rebuild()
+            return
+
+        now = conn.execute("SELECT datetime('now') AS now").fetchone()['now']
+        # Only issues that crossed a threshold since the watermark change state
+        deltas = conn.execute("""
+            SELECT project_id,
+                   SUM(sla_at_risk_date <= :now AND sla_due_date > :now)
+                       - SUM(sla_at_risk_date <= :w AND sla_due_date > :w) AS at_risk_delta,
+                   SUM(sla_due_date <= :now) - SUM(sla_due_date <= :w) AS breached_delta
+            FROM issues
+            WHERE id IN (
+                SELECT id FROM issues
+                WHERE deleted_at IS NULL AND status != 'Resolved'
+                  AND sla_at_risk_date > :w AND sla_at_risk_date <= :now
+                UNION
+                SELECT id FROM issues
+                WHERE deleted_at IS NULL AND status != 'Resolved'
+                  AND sla_due_date > :w AND sla_due_date <= :now
+            )
+            GROUP BY project_id
+        """, {"w": evaluated_until, "now": now}).fetchall()
+        conn.executemany("""
+            UPDATE sla_counters
+            SET at_risk_count = at_risk_count + ?, breached_count = breached_count + ?
+            WHERE project_id = ?
+        """, [(row['at_risk_delta'], row['breached_delta'], row['project_id']) for row in deltas])
+        conn.execute("UPDATE sla_state SET evaluated_until = ? WHERE id = 1", (now,))
+        conn.commit()
+        conn.close()
+
+    def get_summary(self):
+        """Get total open, at-risk and breached issue counts across live projects"""
+        conn = get_db_connection()
+        row = conn.execute("""
+            SELECT COALESCE(SUM(open_count), 0) AS open_count,
+                   COALESCE(SUM(at_risk_count), 0) AS at_risk_count,
+                   COALESCE(SUM(breached_count), 0) AS breached_count
+            FROM sla_counters
+        """).fetchone()
+        conn.close()
+        return dict(row)
+
+    def get_project_counters(self, limit=10):
+        """Get the projects with the most breached, then at-risk, issues"""
+        conn = get_db_connection()
+        rows = conn.execute("""
+            SELECT c.*, p.client_name, p.project_name
+            FROM sla_counters c
+            JOIN projects p ON c.project_id = p.id
+            WHERE c.breached_count > 0 OR c.at_risk_count > 0
+            ORDER BY c.breached_count DESC, c.at_risk_count DESC
+            LIMIT ?
+        """, (limit,)).fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
\ No newline at end of file
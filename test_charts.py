@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from charts import build_analytics_figures, figure_payload_size
+
+# Largest serialized figure allowed on the Analytics page, in bytes
+MAX_PAYLOAD_BYTES = 50 * 1024
+
+def make_projects(count):
+    rng = np.random.default_rng(0)
+    progress = rng.uniform(0, 100, count)
+    # Projects without phases have no progress yet
+    progress[::7] = np.nan
+    return pd.DataFrame({
+        'client_name': [f"Client {i % 300}" for i in range(count)],
+        'project_name': [f"Project number {i}" for i in range(count)],
+        'overall_progress': progress,
+    })
+
+def test_payload_capped_at_10k_projects():
+    phases_df = pd.DataFrame({
+        'phase_name': ["Requirement Gathering", "Configuration", "Testing", "Training", "Deployment"],
+        'avg_completion': [90, 70, 50, 30, 10],
+    })
+    issues_df = pd.DataFrame({'status': ["Open", "In Progress", "Resolved"], 'count': [4000, 3000, 3000]})
+
+    figures = build_analytics_figures(make_projects(10000), phases_df, issues_df)
+
+    assert len(figures) == 4
+    for title, fig in figures:
+        assert figure_payload_size(fig) < MAX_PAYLOAD_BYTES, title
+
+def test_small_portfolio_keeps_one_bar_per_project():
+    figures = build_analytics_figures(make_projects(10), pd.DataFrame(), pd.DataFrame())
+
+    assert [title for title, _ in figures] == ["Project Completion Status"]
+    assert len(figures[0][1].data[0].y) == 10
\ No newline at end of file
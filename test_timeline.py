@@ -0,0 +1,55 @@
+from datetime import date, timedelta
+
+import database
+from models import Project, ProjectPhase
+from timeline import DETAIL_PHASE_LIMIT, build_timeline_figure
+
+def make_phase(index, start_date, end_date):
+    return {
+        'client_name': f"Client {index % 5}",
+        'project_name': f"Project {index}",
+        'phase_name': "Configuration",
+        'completion_percentage': 50,
+        'start_date': str(start_date),
+        'end_date': str(end_date),
+    }
+
+def test_open_ended_future_phase_ends_at_its_start(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_NAME", str(tmp_path / "test.db"))
+    database.init_database()
+    today = date.today()
+    project_id = Project().create("Client", "Project", str(today), "Configuration")
+    phase_id = ProjectPhase().create(project_id, "Configuration", 1)
+    ProjectPhase().update_dates(phase_id, start_date=str(today + timedelta(days=40)))
+
+    phases = ProjectPhase().get_in_range(today, today + timedelta(days=60))
+
+    assert [(phase['start_date'], phase['end_date']) for phase in phases] == [
+        (str(today + timedelta(days=40)), str(today + timedelta(days=40)))
+    ]
+
+def test_gantt_never_draws_negative_bars():
+    today = date.today()
+    phases = [
+        make_phase(0, today + timedelta(days=40), today + timedelta(days=40)),
+        # End entered before start
+        make_phase(1, today + timedelta(days=40), today),
+    ]
+
+    fig = build_timeline_figure(phases, today, today + timedelta(days=60))
+
+    assert all(width > 0 for width in fig.data[0].x)
+
+def test_heatmap_ignores_inverted_phases():
+    today = date.today()
+    window_end = today + timedelta(days=60)
+    phases = [make_phase(i, today, window_end) for i in range(DETAIL_PHASE_LIMIT)]
+    phases.append(make_phase(DETAIL_PHASE_LIMIT, today + timedelta(days=40), today + timedelta(days=40)))
+    phases.append(make_phase(DETAIL_PHASE_LIMIT + 1, today + timedelta(days=40), today))
+
+    fig = build_timeline_figure(phases, today, window_end)
+
+    active = fig.data[0].z
+    assert active.min() >= 0
+    # Every phase spanning the window is still counted in every bucket
+    assert (active.sum(axis=0) >= DETAIL_PHASE_LIMIT).all()
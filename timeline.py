@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Above this many phases the timeline switches from one bar per phase to a heatmap
+DETAIL_PHASE_LIMIT = 300
+
+# Most rows shown in the aggregated view; the rest are folded into "Other"
+MAX_AGGREGATE_ROWS = 40
+
+# Windows longer than this are bucketed by month instead of by week
+WEEKLY_BUCKET_MAX_DAYS = 730
+
+def build_timeline_figure(phases, start_date, end_date, group_by="client_name"):
+    """Build the portfolio timeline for phases overlapping the window
+
+    Small result sets get a Gantt chart, large ones a heatmap of active phases per
+    group and week (or month). Either way the figure is a single trace built from
+    arrays, so its size does not grow with one trace per phase.
+    """
+    phases_df = pd.DataFrame(phases)
+    if phases_df.empty:
+        return None
+    if len(phases_df) <= DETAIL_PHASE_LIMIT:
+        return _build_gantt(phases_df)
+    return _build_heatmap(phases_df, start_date, end_date, group_by)
+
+def _build_gantt(phases_df):
+    """One horizontal bar per phase, all in a single trace"""
+    starts = pd.to_datetime(phases_df['start_date'])
+    # End dates are inclusive, so a phase lasts until the end of its last day; a
+    # phase whose end was entered before its start is drawn as a single day
+    ends = pd.to_datetime(phases_df['end_date']).clip(lower=starts) + pd.Timedelta(days=1)
+    labels = phases_df['client_name'] + " - " + phases_df['project_name'] + ": " + phases_df['phase_name']
+
+    fig = go.Figure(go.Bar(
+        base=starts.dt.strftime('%Y-%m-%d').to_numpy(),
+        x=((ends - starts).dt.total_seconds() * 1000).to_numpy(),
+        y=labels.to_numpy(),
+        orientation='h',
+        marker=dict(
+            color=phases_df['completion_percentage'].to_numpy(),
+            colorscale='RdYlGn',
+            cmin=0,
+            cmax=100,
+            colorbar=dict(title='Completion %')
+        ),
+        customdata=phases_df[['start_date', 'end_date', 'completion_percentage']].to_numpy(),
+        hovertemplate="%{y}<br>%{customdata[0]} to %{customdata[1]}<br>%{customdata[2]}% complete<extra></extra>"
+    ))
+    fig.update_layout(
+        title="Phase Timeline",
+        xaxis=dict(type='date'),
+        yaxis=dict(autorange='reversed'),
+        height=max(300, 22 * len(phases_df))
+    )
+    return fig
+
+def _build_heatmap(phases_df, start_date, end_date, group_by):
+    """Count active phases per group and bucket with a difference array"""
+    window_start = pd.Timestamp(start_date)
+    window_end = pd.Timestamp(end_date)
+    freq = 'W' if (window_end - window_start).days <= WEEKLY_BUCKET_MAX_DAYS else 'M'
+
+    starts = pd.to_datetime(phases_df['start_date']).clip(lower=window_start)
+    ends = pd.to_datetime(phases_df['end_date']).clip(upper=window_end)
+    buckets = pd.period_range(window_start, window_end, freq=freq)
+    first_ordinal = buckets[0].ordinal
+    start_idx = pd.PeriodIndex(starts, freq=freq).asi8 - first_ordinal
+    end_idx = pd.PeriodIndex(ends, freq=freq).asi8 - first_ordinal
+    # A phase ending before it starts (or outside the window) would subtract from others
+    valid = end_idx >= start_idx
+
+    # Keep the busiest groups and fold the rest into "Other"
+    groups = phases_df[group_by]
+    busiest = groups.value_counts().index[:MAX_AGGREGATE_ROWS - 1]
+    if groups.nunique() > MAX_AGGREGATE_ROWS:
+        groups = groups.where(groups.isin(busiest), "Other")
+    codes, names = pd.factorize(groups, sort=True)
+
+    active = np.zeros((len(names), len(buckets) + 1), dtype=np.int64)
+    np.add.at(active, (codes[valid], start_idx[valid]), 1)
+    np.add.at(active, (codes[valid], end_idx[valid] + 1), -1)
+    active = active.cumsum(axis=1)[:, :-1]
+
+    bucket_label = "Week" if freq == 'W' else "Month"
+    fig = go.Figure(go.Heatmap(
+        z=active,
+        x=buckets.start_time.strftime('%Y-%m-%d'),
+        y=list(names),
+        colorscale='Blues',
+        colorbar=dict(title='Active phases'),
+        hovertemplate=f"%{{y}}<br>{bucket_label} of %{{x}}<br>%{{z}} active phases<extra></extra>"
+    ))
+    fig.update_layout(
+        title=f"Active Phases per {bucket_label}",
+        xaxis=dict(type='date'),
+        yaxis=dict(autorange='reversed'),
+        height=max(300, 22 * len(names))
+    )
+    return fig
\ No newline at end of file